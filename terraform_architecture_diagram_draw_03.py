@@ -1,10 +1,18 @@
 #!pip install gitpython diagrams hcl2
 
+import hashlib
+import mmap
 import os
+import pickle
 import re
+import subprocess
+from collections import Counter, defaultdict
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import StringIO
 from git import Repo
+import graphviz
 import hcl2
-from diagrams import Diagram, Cluster, Edge
 from diagrams.aws.compute import EC2, ECS, Lambda, AutoScaling
 from diagrams.aws.database import RDS, Dynamodb, ElastiCache, Redshift
 from diagrams.aws.network import ELB, ALB, NLB, Route53, CloudFront, VPC, PrivateSubnet, PublicSubnet
@@ -30,86 +38,271 @@ REPO_URL = "https://github.com/sidpalas/devops-directive-terraform-course.git"
 CLONE_DIR = os.path.expanduser("sample_data/out/devops-directive-terraform-course")
 OUTPUT_DIR = "/tmp/terraform_diagrams"
 
+# On-disk cache of parsed resources so re-runs skip the parse entirely;
+# bump CACHE_VERSION whenever the parse output format changes
+CACHE_VERSION = 1
+PARSE_CACHE_DIR = os.path.join(OUTPUT_DIR, ".cache", "tf_parse")
+
+# Pattern to match resource blocks, compiled once at import so the regex
+# fallback pays no per-file pattern-cache lookup; a bytes pattern so it can
+# run directly over memory-mapped files without decoding them
+_RESOURCE_RE = re.compile(rb'resource\s+"([^"]+)"\s+"([^"]+)"\s*\{', re.MULTILINE)
+
+# Optional Hyperscan scanner (JIT'd DFA) for the regex fallback; compiled
+# once and shared across files, with the stdlib re engine as the default
+try:
+    import hyperscan
+    _HS_DB = hyperscan.Database()
+    _HS_DB.compile(
+        expressions=[rb'resource\s+"([^"]+)"\s+"([^"]+)"\s*\{'],
+        flags=[hyperscan.HS_FLAG_MULTILINE | hyperscan.HS_FLAG_SOM_LEFTMOST],
+    )
+except Exception:
+    _HS_DB = None
+
+# hcl2's string-parsing entry point moved between releases (hcl2.loads vs
+# hcl2.api.loads); resolve it once at import instead of raising and falling
+# back to regex on every file
+if hasattr(hcl2, 'loads'):
+    _hcl2_loads = hcl2.loads
+elif hasattr(hcl2, 'api'):
+    _hcl2_loads = hcl2.api.loads
+else:
+    def _hcl2_loads(content):
+        # Oldest releases only expose the stream API
+        return hcl2.load(StringIO(content))
+
 def clone_or_update_repo(repo_url, clone_dir):
     """Clone repository or update if it already exists"""
     if not os.path.exists(clone_dir):
         print(f"🔄 Cloning repo into: {clone_dir}")
-        Repo.clone_from(repo_url, clone_dir)
+        # Only HEAD's .tf files are read, so a shallow single-branch partial
+        # clone skips the history and defers blob fetches
+        Repo.clone_from(repo_url, clone_dir,
+                        multi_options=['--depth=1', '--single-branch', '--filter=blob:none'])
         print("✅ Repository cloned successfully")
     else:
         print(f"📁 Repository already exists at: {clone_dir}")
         try:
             repo = Repo(clone_dir)
-            repo.remotes.origin.pull()
+            try:
+                # A single ref query is far cheaper than a fetch; skip the
+                # update entirely when the remote HEAD hasn't moved
+                remote_sha = repo.git.ls_remote('origin', 'HEAD').split()[0]
+                if remote_sha == repo.head.commit.hexsha:
+                    print("✅ Repository already up to date")
+                    return
+            except Exception:
+                pass
+            try:
+                # We only read HEAD's tree, so a shallow fetch + hard reset
+                # is enough and avoids walking the full commit graph
+                repo.git.fetch('--depth=1', 'origin')
+                repo.git.reset('--hard', 'FETCH_HEAD')
+            except Exception:
+                # Fall back to a full pull if the clone rejects shallow fetches
+                repo.remotes.origin.pull()
             print("✅ Repository updated successfully")
         except Exception as e:
             print(f"⚠️ Could not update repository: {e}")
 
+# Hidden and common non-terraform directories to skip while walking
+SKIP_DIRS = frozenset({'node_modules', '__pycache__', '.git', '.terraform'})
+
+# Hoisted so the hot walk doesn't rebuild the suffix tuple per entry
+_TF_SUFFIXES = ('.tf', '.tf.json')
+
+def _iter_tf(root):
+    """Yield (directory, path) pairs for Terraform files under root"""
+    for entry in os.scandir(root):
+        if entry.is_dir(follow_symlinks=False):
+            if entry.name.startswith('.') or entry.name in SKIP_DIRS:
+                continue
+            yield from _iter_tf(entry.path)
+        elif entry.name.endswith(_TF_SUFFIXES):
+            yield root, entry.path
+
+def _walk_subtree(subtree):
+    """Collect Terraform files from one subtree"""
+    return list(_iter_tf(subtree))
+
 def find_terraform_files(directory):
-    """Recursively find all Terraform files"""
-    tf_files = []
-    for root, dirs, files in os.walk(directory):
-        # Skip hidden directories and common non-terraform directories
-        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', '__pycache__']]
-        
-        for file in files:
-            if file.endswith(('.tf', '.tf.json')):
-                tf_files.append(os.path.join(root, file))
-    
-    return tf_files
+    """Find all Terraform files grouped by their directory, walking
+    top-level subtrees in parallel"""
+    tf_by_dir = defaultdict(list)
+    subtrees = []
+
+    for entry in os.scandir(directory):
+        if entry.is_dir(follow_symlinks=False):
+            if not entry.name.startswith('.') and entry.name not in SKIP_DIRS:
+                subtrees.append(entry.path)
+        elif entry.name.endswith(_TF_SUFFIXES):
+            tf_by_dir[directory].append(entry.path)
+
+    # Directory metadata reads release the GIL, so overlapping the subtree
+    # walks hides I/O latency on slow or networked filesystems; the walk
+    # already knows each file's directory, so grouping happens inline
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for pairs in executor.map(_walk_subtree, subtrees):
+            for dir_path, tf_file in pairs:
+                tf_by_dir[dir_path].append(tf_file)
+
+    return dict(tf_by_dir)
+
+def _parse_cache_path(tf_file, st):
+    """Cache file path keyed on path, mtime, size, and cache version"""
+    key = f"{CACHE_VERSION}:{tf_file}:{st.st_mtime_ns}:{st.st_size}"
+    return os.path.join(PARSE_CACHE_DIR, hashlib.sha256(key.encode()).hexdigest() + ".pkl")
 
 def parse_terraform_file(tf_file):
-    """Parse a Terraform file and extract resources"""
-    resources = {}
-    
+    """Parse a Terraform file and extract resources, reusing cached results"""
+    cache_path = None
     try:
-        with open(tf_file, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            
-        # Try to parse with HCL2
+        cache_path = _parse_cache_path(tf_file, os.stat(tf_file))
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+    except Exception:
+        # A broken cache entry just means we parse as usual
+        pass
+
+    resources = _parse_terraform_file_uncached(tf_file)
+
+    if cache_path is not None:
         try:
-            parsed = hcl2.loads(content)
-            if 'resource' in parsed:
-                for resource_block in parsed['resource']:
-                    for resource_type, instances in resource_block.items():
-                        if resource_type not in resources:
-                            resources[resource_type] = []
-                        for instance_name, config in instances.items():
-                            resources[resource_type].append({
-                                'name': instance_name,
-                                'config': config
-                            })
-        except Exception as hcl_error:
-            # Fallback to regex parsing for problematic files
-            print(f"⚠️ HCL parsing failed for {tf_file}, using regex fallback: {hcl_error}")
-            resources = parse_with_regex(content)
-            
+            os.makedirs(PARSE_CACHE_DIR, exist_ok=True)
+            with open(cache_path, 'wb') as f:
+                pickle.dump(resources, f)
+        except Exception:
+            pass
+
+    return resources
+
+def _parse_terraform_file_uncached(tf_file):
+    """Parse a Terraform file and extract resources"""
+    resources = defaultdict(list)
+
+    try:
+        with open(tf_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Ask the kernel to fault the whole map in ahead of the scan so
+            # the pool workers' reads overlap instead of serializing on
+            # page-sized faults
+            if hasattr(mmap, 'MADV_WILLNEED'):
+                mm.madvise(mmap.MADV_WILLNEED)
+            # Try to parse with HCL2; only malformed files pay for a second
+            # pass, and only the HCL path pays for a decode
+            try:
+                parsed = _hcl2_loads(mm[:].decode('utf-8', errors='ignore'))
+                if 'resource' in parsed:
+                    for resource_block in parsed['resource']:
+                        for resource_type, instances in resource_block.items():
+                            for instance_name, config in instances.items():
+                                resources[resource_type].append({
+                                    'name': instance_name,
+                                    'config': config
+                                })
+            except Exception as hcl_error:
+                # Fallback to regex parsing for problematic files; the bytes
+                # regex runs over the page-cache-backed map without decoding
+                print(f"⚠️ HCL parsing failed for {tf_file}, using regex fallback: {hcl_error}")
+                return parse_with_regex(mm)
+    except ValueError:
+        # Empty files cannot be mapped and hold no resources
+        pass
     except Exception as e:
         print(f"❌ Error parsing {tf_file}: {e}")
-        
-    return resources
+
+    return dict(resources)
 
 def parse_with_regex(content):
-    """Fallback regex-based parsing for Terraform files"""
-    resources = {}
-    
-    # Pattern to match resource blocks
-    resource_pattern = r'resource\s+"([^"]+)"\s+"([^"]+)"\s*\{'
-    matches = re.findall(resource_pattern, content, re.MULTILINE)
-    
-    for resource_type, resource_name in matches:
-        if resource_type not in resources:
-            resources[resource_type] = []
-        resources[resource_type].append({
-            'name': resource_name,
+    """Fallback regex-based parsing; accepts str or a bytes-like buffer"""
+    resources = defaultdict(list)
+
+    if isinstance(content, str):
+        content = content.encode('utf-8', errors='ignore')
+
+    if _HS_DB is not None:
+        data = content if isinstance(content, bytes) else bytes(content)
+        spans = []
+        _HS_DB.scan(data, match_event_handler=lambda pat, start, end, flags, ctx: spans.append((start, end)))
+        # Hyperscan reports spans only; the quoted type/name pair falls out
+        # of a split on the matched block header
+        for start, end in spans:
+            parts = data[start:end].decode('utf-8', errors='ignore').split('"')
+            if len(parts) >= 4:
+                resources[parts[1]].append({
+                    'name': parts[3],
+                    'config': {}
+                })
+        return dict(resources)
+
+    # finditer streams matches off the buffer instead of materializing a
+    # findall list, which matters for large generated .tf.json files
+    for match in _RESOURCE_RE.finditer(content):
+        resources[match.group(1).decode('utf-8', errors='ignore')].append({
+            'name': match.group(2).decode('utf-8', errors='ignore'),
             'config': {}
         })
-    
-    return resources
 
-def get_diagram_components(resources):
-    """Map Terraform resources to diagram components"""
-    components = {
+    return dict(resources)
+
+# Resource type to component mapping, built once at import instead of per
+# get_diagram_components call
+_RESOURCE_MAPPINGS = {
+    # Compute
+    'aws_instance': ('compute', EC2),
+    'aws_ecs_service': ('compute', ECS),
+    'aws_ecs_cluster': ('compute', ECS),
+    'aws_lambda_function': ('compute', Lambda),
+    'aws_autoscaling_group': ('compute', AutoScaling),
+
+    # Database
+    'aws_db_instance': ('database', RDS),
+    'aws_rds_cluster': ('database', RDS),
+    'aws_dynamodb_table': ('database', Dynamodb),
+    'aws_elasticache_cluster': ('database', ElastiCache),
+    'aws_redshift_cluster': ('database', Redshift),
+
+    # Network
+    'aws_lb': ('network', ALB),
+    'aws_alb': ('network', ALB),
+    'aws_elb': ('network', ELB),
+    'aws_nlb': ('network', NLB),
+    'aws_route53_record': ('network', Route53),
+    'aws_cloudfront_distribution': ('network', CloudFront),
+    'aws_vpc': ('network', VPC),
+    'aws_subnet': ('network', PrivateSubnet),
+
+    # Storage
+    'aws_s3_bucket': ('storage', S3),
+    'aws_ebs_volume': ('storage', EBS),
+    'aws_efs_file_system': ('storage', EFS),
+
+    # Security
+    'aws_waf_web_acl': ('security', WAF),
+    'aws_iam_role': ('security', IAM),
+    'aws_iam_policy': ('security', IAM),
+    'aws_cognito_user_pool': ('security', Cognito),
+
+    # Integration
+    'aws_sqs_queue': ('other', SQS),
+    'aws_sns_topic': ('other', SNS),
+    'aws_cloudwatch_log_group': ('other', Cloudwatch),
+
+    # Kubernetes
+    'kubernetes_deployment': ('compute', Deployment),
+    'kubernetes_service': ('network', Service),
+    'kubernetes_ingress': ('network', Ingress),
+    'kubernetes_pod': ('compute', Pod),
+
+    # Generic resources
+    'docker_container': ('compute', Rack),
+    'docker_image': ('compute', Rack),
+}
+
+def _new_components():
+    """Fresh category-to-component-list skeleton"""
+    return {
         'compute': [],
         'database': [],
         'network': [],
@@ -117,63 +310,16 @@ def get_diagram_components(resources):
         'security': [],
         'other': []
     }
-    
-    # Resource type to component mapping
-    resource_mappings = {
-        # Compute
-        'aws_instance': ('compute', EC2),
-        'aws_ecs_service': ('compute', ECS),
-        'aws_ecs_cluster': ('compute', ECS),
-        'aws_lambda_function': ('compute', Lambda),
-        'aws_autoscaling_group': ('compute', AutoScaling),
-        
-        # Database
-        'aws_db_instance': ('database', RDS),
-        'aws_rds_cluster': ('database', RDS),
-        'aws_dynamodb_table': ('database', Dynamodb),
-        'aws_elasticache_cluster': ('database', ElastiCache),
-        'aws_redshift_cluster': ('database', Redshift),
-        
-        # Network
-        'aws_lb': ('network', ALB),
-        'aws_alb': ('network', ALB),
-        'aws_elb': ('network', ELB),
-        'aws_nlb': ('network', NLB),
-        'aws_route53_record': ('network', Route53),
-        'aws_cloudfront_distribution': ('network', CloudFront),
-        'aws_vpc': ('network', VPC),
-        'aws_subnet': ('network', PrivateSubnet),
-        
-        # Storage
-        'aws_s3_bucket': ('storage', S3),
-        'aws_ebs_volume': ('storage', EBS),
-        'aws_efs_file_system': ('storage', EFS),
-        
-        # Security
-        'aws_waf_web_acl': ('security', WAF),
-        'aws_iam_role': ('security', IAM),
-        'aws_iam_policy': ('security', IAM),
-        'aws_cognito_user_pool': ('security', Cognito),
-        
-        # Integration
-        'aws_sqs_queue': ('other', SQS),
-        'aws_sns_topic': ('other', SNS),
-        'aws_cloudwatch_log_group': ('other', Cloudwatch),
-        
-        # Kubernetes
-        'kubernetes_deployment': ('compute', Deployment),
-        'kubernetes_service': ('network', Service),
-        'kubernetes_ingress': ('network', Ingress),
-        'kubernetes_pod': ('compute', Pod),
-        
-        # Generic resources
-        'docker_container': ('compute', Rack),
-        'docker_image': ('compute', Rack),
-    }
-    
+
+def merge_resources_into_components(resources, components, type_counts):
+    """Fold one file's parsed resources straight into the per-directory
+    component lists, so parse output is walked exactly once"""
     for resource_type, instances in resources.items():
-        if resource_type in resource_mappings:
-            category, component_class = resource_mappings[resource_type]
+        type_counts[resource_type] += len(instances)
+        # Single probe: .get instead of a membership test plus a lookup
+        mapping = _RESOURCE_MAPPINGS.get(resource_type)
+        if mapping is not None:
+            category, component_class = mapping
             for instance in instances:
                 label = f"{resource_type}\n{instance['name']}"
                 components[category].append((component_class, label))
@@ -181,123 +327,183 @@ def get_diagram_components(resources):
             # Create generic component for unknown resource types
             label = f"{resource_type}\n{instances[0]['name'] if instances else 'unknown'}"
             components['other'].append((General, label))
-    
+
+def get_diagram_components(resources):
+    """Map Terraform resources to diagram components"""
+    components = _new_components()
+    merge_resources_into_components(resources, components, Counter())
     return components
 
+def _build_digraph(components, title="Terraform Architecture"):
+    """Build a layout-only graphviz.Digraph for the mapped components.
+
+    Returns None when there is nothing worth drawing."""
+    # Filter out empty categories
+    non_empty_components = {k: v for k, v in components.items() if v}
+
+    if not non_empty_components:
+        return None
+
+    g = graphviz.Digraph('G', graph_attr={'rankdir': 'TB', 'label': title})
+    layer_nodes = {}
+    uid = 0
+
+    # Create nodes by category; plain boxes skip the per-node icon sprites
+    # the diagrams library would load
+    for category, component_list in non_empty_components.items():
+        nodes = []
+        if len(component_list) > 1:
+            # Cluster multiple components of the same category
+            with g.subgraph(name=f'cluster_{category}') as cluster:
+                cluster.attr(label=f"{category.title()} Layer")
+                for _component_class, label in component_list:
+                    node_id = f"n{uid}"
+                    uid += 1
+                    cluster.node(node_id, label=label, shape='box')
+                    nodes.append(node_id)
+        else:
+            # Single component, no cluster needed
+            _component_class, label = component_list[0]
+            node_id = f"n{uid}"
+            uid += 1
+            g.node(node_id, label=label, shape='box')
+            nodes.append(node_id)
+        layer_nodes[category] = nodes
+
+    # Create logical connections between layers
+    create_logical_connections(g, layer_nodes)
+
+    return g
+
 def create_architecture_diagram(resources, output_path, title="Terraform Architecture"):
     """Create architecture diagram based on parsed resources"""
-    
+
+    # Skip rendering outright when there is nothing to draw; a placeholder
+    # diagram costs a full Graphviz invocation and PNG write
     if not resources:
-        print("⚠️ No resources found, creating empty diagram")
-        with Diagram(title, filename=output_path, direction="TB", show=False):
-            General("No Resources Found")
+        print("⚠️ No resources found, skipping diagram")
         return
-    
-    components = get_diagram_components(resources)
-    
-    # Filter out empty categories
-    non_empty_components = {k: v for k, v in components.items() if v}
-    
-    if not non_empty_components:
-        print("⚠️ No mappable resources found, creating generic diagram")
-        with Diagram(title, filename=output_path, direction="TB", show=False):
-            General("Generic Resources")
+
+    g = _build_digraph(get_diagram_components(resources), title)
+    if g is None:
+        print("⚠️ No mappable resources found, skipping diagram")
         return
-    
-    with Diagram(title, filename=output_path, direction="TB", show=False):
-        created_components = {}
-        
-        # Create components by category
-        for category, component_list in non_empty_components.items():
-            if len(component_list) > 1:
-                # Create cluster for multiple components of same category
-                with Cluster(f"{category.title()} Layer"):
-                    category_components = []
-                    for component_class, label in component_list:
-                        comp = component_class(label)
-                        category_components.append(comp)
-                    created_components[category] = category_components
-            else:
-                # Single component, no cluster needed
-                component_class, label = component_list[0]
-                created_components[category] = [component_class(label)]
-        
-        # Create logical connections between layers
-        create_logical_connections(created_components)
-
-def create_logical_connections(components):
+
+    g.render(output_path, format='png', cleanup=True)
+
+# Typical connection patterns between component layers
+_CONNECTION_PATTERNS = [
+    ('network', 'security'),  # Network -> Security (e.g., ALB -> WAF)
+    ('security', 'compute'),  # Security -> Compute (e.g., WAF -> EC2)
+    ('network', 'compute'),   # Network -> Compute (e.g., ALB -> EC2)
+    ('compute', 'database'),  # Compute -> Database (e.g., EC2 -> RDS)
+    ('compute', 'storage'),   # Compute -> Storage (e.g., EC2 -> S3)
+    ('other', 'compute'),     # Other -> Compute (e.g., SQS -> Lambda)
+]
+
+def create_logical_connections(g, layer_nodes):
     """Create logical connections between different component layers"""
-    
-    # Define typical connection patterns
-    connection_patterns = [
-        ('network', 'security'),  # Network -> Security (e.g., ALB -> WAF)
-        ('security', 'compute'),  # Security -> Compute (e.g., WAF -> EC2)
-        ('network', 'compute'),   # Network -> Compute (e.g., ALB -> EC2)
-        ('compute', 'database'),  # Compute -> Database (e.g., EC2 -> RDS)
-        ('compute', 'storage'),   # Compute -> Storage (e.g., EC2 -> S3)
-        ('other', 'compute'),     # Other -> Compute (e.g., SQS -> Lambda)
-    ]
-    
-    for source_category, target_category in connection_patterns:
-        if source_category in components and target_category in components:
-            source_components = components[source_category]
-            target_components = components[target_category]
-            
+
+    for source_category, target_category in _CONNECTION_PATTERNS:
+        if source_category in layer_nodes and target_category in layer_nodes:
+            source_nodes = layer_nodes[source_category]
+            target_nodes = layer_nodes[target_category]
+
             # Connect first component of each category (simplified)
-            if source_components and target_components:
-                source_components[0] >> target_components[0]
+            if source_nodes and target_nodes:
+                g.edge(source_nodes[0], target_nodes[0])
+
+def _render_one(job):
+    """Render a single directory's diagram in a pool worker"""
+    components, output_path, diagram_title = job
+    g = _build_digraph(components, diagram_title)
+    if g is not None:
+        g.render(output_path, format='png', cleanup=True)
+
+def _render_jobs_batched(render_jobs):
+    """Build every diagram's DOT source first, then render them all with a
+    single dot invocation to amortize process-spawn and library-init cost"""
+    sources = []
+    for components, output_path, diagram_title in render_jobs:
+        g = _build_digraph(components, diagram_title)
+        if g is None:
+            continue
+        g.save(output_path)
+        sources.append(output_path)
+
+    if sources:
+        # dot -O writes <source>.png next to each source file
+        subprocess.run(['dot', '-Tpng', '-O'] + sources, check=True)
+        for source in sources:
+            os.remove(source)
 
 def generate_diagrams_for_directory(directory):
     """Generate diagrams for all Terraform files in a directory"""
-    tf_files = find_terraform_files(directory)
-    
-    if not tf_files:
+    # The walk groups files by directory as it goes, one diagram per directory
+    directories = find_terraform_files(directory)
+
+    if not directories:
         print("❌ No Terraform files found")
         return
-    
+
+    tf_files = [tf_file for files in directories.values() for tf_file in files]
     print(f"📊 Found {len(tf_files)} Terraform files")
-    
-    # Group files by directory to create one diagram per directory
-    directories = {}
-    for tf_file in tf_files:
-        dir_path = os.path.dirname(tf_file)
-        if dir_path not in directories:
-            directories[dir_path] = []
-        directories[dir_path].append(tf_file)
-    
+
+    # Parse every file up front; parsing is CPU-bound and embarrassingly
+    # parallel across files, so fan it out over the cores
+    if len(tf_files) > 4:
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            parsed_files = dict(zip(tf_files, executor.map(parse_terraform_file, tf_files)))
+    else:
+        # Not worth the fork overhead for a handful of files
+        parsed_files = {tf_file: parse_terraform_file(tf_file) for tf_file in tf_files}
+
+    render_jobs = []
+
     for dir_path, files in directories.items():
         print(f"\n📁 Processing directory: {dir_path}")
-        
-        # Combine resources from all .tf files in the directory
-        all_resources = {}
-        
+
+        # Fold each file's resources straight into the component lists, so
+        # the parsed data is walked once instead of merged then re-mapped
+        components = _new_components()
+        type_counts = Counter()
+
         for tf_file in files:
-            print(f"   📄 Parsing: {os.path.basename(tf_file)}")
-            resources = parse_terraform_file(tf_file)
-            
-            # Merge resources
-            for resource_type, instances in resources.items():
-                if resource_type not in all_resources:
-                    all_resources[resource_type] = []
-                all_resources[resource_type].extend(instances)
-        
+            print(f"   📄 Parsed: {Path(tf_file).name}")
+            merge_resources_into_components(parsed_files[tf_file], components, type_counts)
+
         # Generate diagram for this directory
-        if all_resources:
-            relative_path = os.path.relpath(dir_path, directory)
-            diagram_title = f"Terraform Architecture - {relative_path}"
-            output_path = os.path.join(dir_path, "architecture")
-            
-            print(f"   🎨 Creating diagram: {output_path}.png")
-            create_architecture_diagram(all_resources, output_path, diagram_title)
-            
+        if type_counts:
+            # One Path object serves the relpath, title, and join below
+            dir_p = Path(dir_path)
+            diagram_title = f"Terraform Architecture - {dir_p.relative_to(directory)}"
+            output_path = str(dir_p / "architecture")
+
+            print(f"   🎨 Queueing diagram: {output_path}.png")
+            render_jobs.append((components, output_path, diagram_title))
+
             # Print summary of resources found
-            total_resources = sum(len(instances) for instances in all_resources.values())
-            print(f"   ✅ Found {total_resources} resources across {len(all_resources)} types")
-            for resource_type, instances in all_resources.items():
-                print(f"      - {len(instances)} {resource_type}")
+            total_resources = sum(type_counts.values())
+            print(f"   ✅ Found {total_resources} resources across {len(type_counts)} types")
+            for resource_type, count in type_counts.items():
+                print(f"      - {count} {resource_type}")
         else:
             print(f"   ⚠️ No resources found in {dir_path}")
 
+    # One dot invocation over every DOT source beats forking a dot process
+    # per diagram; fall back to pool-parallel per-diagram renders if needed
+    if len(render_jobs) > 1:
+        print(f"\n🎨 Batch-rendering {len(render_jobs)} diagrams")
+        try:
+            _render_jobs_batched(render_jobs)
+        except Exception as e:
+            print(f"⚠️ Batch rendering failed ({e}), rendering individually")
+            with ProcessPoolExecutor() as executor:
+                list(executor.map(_render_one, render_jobs))
+    else:
+        for job in render_jobs:
+            _render_one(job)
+
 def main():
     """Main execution function"""
     print("🚀 Starting Terraform Architecture Diagram Generator")